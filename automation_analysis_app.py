@@ -1,73 +1,363 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+from numba import njit
 import seaborn as sns
 import matplotlib.pyplot as plt
 from datetime import datetime
 import io
-from difflib import SequenceMatcher
+import os
+import csv
+import hashlib
+import json
+import tempfile
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from rapidfuzz import process, fuzz
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 st.set_page_config(page_title="Automation Governance Tool", layout="wide")
 st.title("🤖 Automation Usage & Governance Analyzer")
 
 uploaded_file = st.file_uploader("📤 Upload your automation log CSV file", type=["csv"])
 
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "automation_cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_VERSION = 7  # bump whenever load_data changes the columns it produces
+CSV_COLUMN_TYPES = {
+    '30DayRunCount': pa.float64(),
+    '30DayErrorCount': pa.float64(),
+    '30DaySkipCount': pa.float64(),
+    '30DayCompletionCount': pa.float64(),
+    '30DaySuccessRate': pa.float64(),
+}
+AGE_BIN_EDGES = np.array([30, 90, 180, 365])
+AGE_GROUP_LABELS = ["<1 mo", "1–3 mo", "3–6 mo", "6–12 mo", ">1 yr"]
+TIMELINE_MAX_POINTS = 5000
+LARGE_FILE_BYTES = 500 * 1024 * 1024  # needs server.maxUploadSize above 500 (.streamlit/config.toml)
+CHUNK_ROWS = 200_000
+TOP_ERROR_ROWS = 1000
+INTERNAL_COLUMNS = ['IsHourly']
+CHUNK_TEXT_DTYPES = {'AutomationName': str, 'BusinessUnitName': str, 'ScheduledFrequency': str}
+MERGE_CACHE_ENTRIES = 32
+MERGE_BATCH_ROWS = 512
+MERGE_CACHE_VERSION = 2  # bump whenever find_similar_groups can return different groups
+TIMESTAMP_FORMATS = [pa_csv.ISO8601, '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y']
+
 @st.cache_data
-def load_data(uploaded_file):
-    df = pd.read_csv(uploaded_file, sep=None, engine='python', parse_dates=['CreatedDate', 'LastRunTime'])
+def load_data(file_bytes):
+    # Parsed uploads are kept on disk as Parquet, keyed by content hash, so reruns skip the CSV parse
+    cache_path = os.path.join(CACHE_DIR, f"{hashlib.blake2b(file_bytes).hexdigest()}.v{CACHE_VERSION}.parquet")
+    try:
+        df = pd.read_parquet(cache_path)
+        os.utime(cache_path)  # mark as recently used for eviction
+        return df
+    except OSError:
+        pass  # not cached yet, or evicted by another session
+
+    table = pa_csv.read_csv(
+        io.BytesIO(file_bytes),
+        parse_options=pa_csv.ParseOptions(delimiter=sniff_delimiter(file_bytes[:64 * 1024])),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=CSV_COLUMN_TYPES, timestamp_parsers=TIMESTAMP_FORMATS, strings_can_be_null=True
+        )
+    )
+    df = prepare_frame(table.to_pandas())
+
+    write_cache_file(cache_path, lambda path: df.to_parquet(path, compression='zstd'))
+    return df
+
+def write_cache_file(cache_path, write):
+    # Write to a private temp file and rename, so concurrent sessions never read a half-written file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_disk_cache()
+
+def evict_disk_cache():
+    # Keep the most recently used files until CACHE_MAX_BYTES is reached and delete the rest
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(('.parquet', '.json')):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = 0
+    for _, size, path in sorted(entries, reverse=True):
+        total += size
+        if total > CACHE_MAX_BYTES:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def sniff_delimiter(sample_bytes):
+    sample = sample_bytes.decode('utf-8-sig', errors='ignore')
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+def prepare_frame(df):
     df.columns = df.columns.str.strip()
-    df['LastRunTime'] = pd.to_datetime(df['LastRunTime'], errors='coerce')
-    df['CreatedDate'] = pd.to_datetime(df['CreatedDate'], errors='coerce')
+    # Arrow already yields timestamps when every value parses; only fall back for the odd column
+    for col in ['LastRunTime', 'CreatedDate']:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
     df['RoundedRunTime'] = df['LastRunTime'].dt.round('h')
-    df['ScheduleGroup'] = df['ScheduledFrequency'].str.split(',').str[0].str.strip()
+    # Single regex pass for the text before the first comma; unlike str.partition it also copes with an empty frame
+    df['ScheduleGroup'] = df['ScheduledFrequency'].str.extract(r'^\s*([^,]*?)\s*(?:,|$)', expand=False)
+    df['ScheduleGroupFilter'] = df['ScheduleGroup'].fillna('Blank')
+
+    # Narrow dtypes so the downstream masks and groupbys move half the bytes
+    for col in ['30DayRunCount', '30DayErrorCount', '30DaySkipCount', '30DayCompletionCount']:
+        # Counters may arrive as '30.0'; keep int32 only when every value is a whole number
+        counts = pd.to_numeric(df[col], errors='coerce')
+        whole = counts.notna().all() and (counts % 1 == 0).all()
+        df[col] = counts.astype('int32' if whole else 'float32')
+    # Rates stay float64: float32 would surface as 0.4000000059604645 in the Excel/Parquet exports
+    df['30DaySuccessRate'] = df['30DaySuccessRate'].astype('float64')
+    for col in ['BusinessUnitName', 'ScheduledFrequency', 'ScheduleGroup', 'ScheduleGroupFilter']:
+        df[col] = df[col].astype('category')
     return df
 
-if uploaded_file:
-    df = load_data(uploaded_file)
+ACTION_LABELS = [
+    "Created But Never Run",
+    "Stale – Consider Archiving",
+    "No Run History",
+    "Inactive",
+    "Error-Prone",
+    "Review High Frequency",
+    "Inefficient",
+    "Excessive Annual Volume",
+    "Keep",
+]
+
+@njit(cache=True)
+def classify_actions(never_run_old, last_age, no_history, runs, error_rate, is_active, hourly, efficiency, annual_runs):
+    # Returns an index into ACTION_LABELS per row; NaN comparisons are False, so missing rates never match
+    codes = np.empty(runs.size, dtype=np.int8)
+    # Serial on purpose: Streamlit sessions call this from concurrent threads, which parallel=True can't survive
+    for i in range(runs.size):
+        if never_run_old[i]:
+            codes[i] = 0
+        elif last_age[i] > 180:
+            codes[i] = 1
+        elif no_history[i]:
+            codes[i] = 2
+        elif runs[i] == 0:
+            codes[i] = 3
+        elif error_rate[i] > 0.5:
+            codes[i] = 4
+        elif is_active[i] and hourly[i]:
+            codes[i] = 5
+        elif efficiency[i] > 0 and efficiency[i] < 0.5 and runs[i] > 10:
+            codes[i] = 6
+        elif annual_runs[i] > 50000:
+            codes[i] = 7
+        else:
+            codes[i] = 8
+    return codes
+
+def find_similar_groups(names):
+    # fuzz.ratio >= 85 needs |len(a) - len(b)| <= 0.15 * (len(a) + len(b)), i.e. 17 * longer <= 23 * shorter.
+    # With names sorted by length, each batch of rows is only scored against a contiguous window of columns.
+    similar_groups = []
+    by_length = np.argsort([len(name) for name in names], kind='stable')
+    sorted_names = names[by_length]
+    lengths = np.array([len(name) for name in sorted_names])
+
+    pair_rows, pair_cols = [], []
+    for start in range(0, len(sorted_names), MERGE_BATCH_ROWS):
+        stop = min(start + MERGE_BATCH_ROWS, len(sorted_names))
+        window_stop = np.searchsorted(lengths, 23 * lengths[stop - 1] // 17, side='right')
+        scores = process.cdist(
+            sorted_names[start:stop], sorted_names[start:window_stop],
+            scorer=fuzz.ratio, score_cutoff=85, dtype=np.uint8, workers=-1
+        )
+        # Scores below the cutoff come back as 0, so any non-zero cell is a match
+        rows, cols = np.nonzero(scores)
+        rows, cols = rows + start, cols + start
+        upper = cols > rows
+        pair_rows.extend(by_length[rows[upper]])
+        pair_cols.extend(by_length[cols[upper]])
+
+    if pair_rows:
+        adjacency = csr_matrix(
+            (np.ones(len(pair_rows), dtype=bool), (pair_rows, pair_cols)),
+            shape=(len(names), len(names))
+        )
+        _, labels = connected_components(adjacency, directed=False)
+        # Most names are singleton components; sort the rest by label and split at label changes
+        in_group = np.flatnonzero(np.bincount(labels)[labels] > 1)
+        order = in_group[np.argsort(labels[in_group], kind='stable')]
+        split_at = np.flatnonzero(np.diff(labels[order])) + 1
+        similar_groups = [set(members) for members in np.split(names[order], split_at)]
+    return similar_groups
+
+@st.cache_data(max_entries=MERGE_CACHE_ENTRIES)
+def compute_similar_groups(names_tuple):
+    # Keyed only by the sorted name set and stored next to the Parquet cache (same LRU eviction),
+    # so repeat uploads of the same log skip the merge search across sessions
+    names_key = hashlib.blake2b('\0'.join(names_tuple).encode()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"{names_key}.groups.v{MERGE_CACHE_VERSION}.json")
+    try:
+        with open(cache_path) as f:
+            groups = json.load(f)
+        os.utime(cache_path)
+        return [frozenset(group) for group in groups]
+    except (OSError, ValueError):
+        pass
 
-    now = pd.Timestamp.now()
+    groups = [sorted(group) for group in find_similar_groups(np.array(names_tuple, dtype=object))]
+
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(groups, f)
+
+    write_cache_file(cache_path, write)
+    return [frozenset(group) for group in groups]
+
+@st.cache_data
+def annotate(file_bytes, now):
+    # now is part of the cache key so ages and stale/inactive flags move with the clock
+    return add_derived_columns(load_data(file_bytes), now)
+
+def add_derived_columns(df, now):
     df['LastRunAgeDays'] = (now - df['LastRunTime']).dt.days
     df['IsActive'] = df['LastRunAgeDays'] <= 30
     df['HasNeverRun'] = df['LastRunTime'].isna()
-    df['AutomationAgeGroup'] = pd.cut(df['LastRunAgeDays'],
-        bins=[-1, 30, 90, 180, 365, float('inf')],
-        labels=["<1 mo", "1–3 mo", "3–6 mo", "6–12 mo", ">1 yr"]
-    )
+    df['HourOfDay'] = df['LastRunTime'].dt.hour
+    # Right-closed bins (-1, 30], (30, 90], ... like pd.cut; unknown ages or ages <= -1 stay NaN
+    ages = df['LastRunAgeDays'].to_numpy(dtype='float64')
+    age_codes = np.searchsorted(AGE_BIN_EDGES, ages, side='left')
+    age_codes[np.isnan(ages) | (ages <= -1)] = -1
+    df['AutomationAgeGroup'] = pd.Categorical.from_codes(age_codes, categories=AGE_GROUP_LABELS, ordered=True)
 
+    # Zero-run automations get NaN rates; one shared denominator instead of a replace() per column
+    runs = df['30DayRunCount'].to_numpy(dtype='float64')
+    safe_runs = np.where(runs == 0, np.nan, runs)
     df['SuccessRate'] = df['30DaySuccessRate']
-    df['ErrorRate'] = df['30DayErrorCount'] / df['30DayRunCount'].replace(0, pd.NA)
-    df['SkipRate'] = df['30DaySkipCount'] / df['30DayRunCount'].replace(0, pd.NA)
-    df['EfficiencyScore'] = df['30DayCompletionCount'] / df['30DayRunCount'].replace(0, pd.NA)
+    df['ErrorRate'] = df['30DayErrorCount'].to_numpy(dtype='float64') / safe_runs
+    df['SkipRate'] = df['30DaySkipCount'].to_numpy(dtype='float64') / safe_runs
+    df['EfficiencyScore'] = df['30DayCompletionCount'].to_numpy(dtype='float64') / safe_runs
     df['AnnualizedRunCount'] = df['30DayRunCount'] * 12
 
-    def suggest_action(row):
-        if row['HasNeverRun'] and row['CreatedDate'] < now - pd.Timedelta(days=90):
-            return "Created But Never Run"
-        elif row['LastRunAgeDays'] > 180:
-            return "Stale – Consider Archiving"
-        elif pd.isna(row['LastRunTime']):
-            return "No Run History"
-        elif row['30DayRunCount'] == 0:
-            return "Inactive"
-        elif row['ErrorRate'] and row['ErrorRate'] > 0.5:
-            return "Error-Prone"
-        elif row['IsActive'] and 'every hour' in str(row['ScheduledFrequency']).lower():
-            return "Review High Frequency"
-        elif row['EfficiencyScore'] and row['EfficiencyScore'] < 0.5 and row['30DayRunCount'] > 10:
-            return "Inefficient"
-        elif row['AnnualizedRunCount'] > 50000:
-            return "Excessive Annual Volume"
-        else:
-            return "Keep"
+    df['IsHourly'] = df['ScheduledFrequency'].str.contains("every hour", case=False, na=False, regex=False).astype(bool)
+    action_codes = classify_actions(
+        (df['HasNeverRun'] & (df['CreatedDate'] < now - pd.Timedelta(days=90))).to_numpy(),
+        ages,
+        df['HasNeverRun'].to_numpy(),
+        runs,
+        df['ErrorRate'].to_numpy(),
+        df['IsActive'].to_numpy(),
+        df['IsHourly'].to_numpy(),
+        df['EfficiencyScore'].to_numpy(),
+        df['AnnualizedRunCount'].to_numpy(dtype='float64')
+    )
+    df['SuggestedAction'] = pd.Categorical.from_codes(action_codes, categories=ACTION_LABELS)
+    return df
+
+@st.cache_data
+def summarize_in_chunks(file_id, now, _uploaded_file):
+    # Only per-chunk aggregates and the top error-prone rows are kept, so the parsed frames stay O(chunk);
+    # the raw upload itself is still held in memory by Streamlit
+    _uploaded_file.seek(0)
+    delimiter = sniff_delimiter(_uploaded_file.read(64 * 1024))
+    _uploaded_file.seek(0)
+
+    total_rows = 0
+    bu_parts, top_errors = [], None
+    action_counts = pd.Series(0, index=pd.CategoricalIndex(ACTION_LABELS, categories=ACTION_LABELS))
+    age_counts = pd.Series(0, index=pd.CategoricalIndex(AGE_GROUP_LABELS, categories=AGE_GROUP_LABELS, ordered=True))
+    # Pin the text columns: a chunk whose schedules are all blank would otherwise be inferred as float64
+    chunks = pd.read_csv(_uploaded_file, sep=delimiter, engine='c', chunksize=CHUNK_ROWS,
+                         parse_dates=['CreatedDate', 'LastRunTime'], dtype=CHUNK_TEXT_DTYPES)
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = add_derived_columns(prepare_frame(chunk), now)
+        total_rows += len(chunk)
+        bu_parts.append(chunk.groupby('BusinessUnitName', observed=True, sort=False).agg(
+            TotalAutomations=('AutomationName', 'count'),
+            ActiveAutomations=('IsActive', 'sum'),
+            SuccessRateSum=('SuccessRate', 'sum'),
+            SuccessRateCount=('SuccessRate', 'count'),
+            TotalRuns=('30DayRunCount', 'sum'),
+            EstimatedAnnualRuns=('AnnualizedRunCount', 'sum')
+        ))
+        action_counts = action_counts + chunk['SuggestedAction'].value_counts(sort=False)
+        age_counts = age_counts + chunk['AutomationAgeGroup'].value_counts(sort=False)
+        chunk_errors = chunk.dropna(subset=['ErrorRate']).nlargest(TOP_ERROR_ROWS, 'ErrorRate')
+        top_errors = pd.concat([top_errors, chunk_errors]).nlargest(TOP_ERROR_ROWS, 'ErrorRate')
+
+    bu_columns = ['TotalAutomations', 'ActiveAutomations', 'AvgSuccessRate', 'TotalRuns', 'EstimatedAnnualRuns']
+    if not total_rows:
+        bu_summary = pd.DataFrame(columns=['BusinessUnitName'] + bu_columns)
+        return total_rows, bu_summary, action_counts, age_counts, None
+
+    bu_summary = pd.concat(bu_parts).groupby(level=0, observed=True).sum()
+    bu_summary['AvgSuccessRate'] = bu_summary.pop('SuccessRateSum') / bu_summary.pop('SuccessRateCount')
+    bu_summary = bu_summary[bu_columns].rename_axis('BusinessUnitName').reset_index()
+    return total_rows, bu_summary, action_counts, age_counts, top_errors
+
+@st.cache_data
+def build_excel(df, hourly, flagged, clashing):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Full Data')
+        hourly.to_excel(writer, index=False, sheet_name='High Frequency')
+        flagged.to_excel(writer, index=False, sheet_name='Flagged')
+        clashing.to_excel(writer, index=False, sheet_name='Clashing')
+    return output.getvalue()
+
+@st.cache_data
+def build_parquet(df):
+    output = io.BytesIO()
+    df.to_parquet(output, index=False, compression='zstd')
+    return output.getvalue()
 
-    df['SuggestedAction'] = df.apply(suggest_action, axis=1)
+if uploaded_file and uploaded_file.size > LARGE_FILE_BYTES:
+    total_rows, bu_summary, action_counts, age_counts, top_errors = summarize_in_chunks(
+        uploaded_file.file_id, pd.Timestamp.now().floor('h'), uploaded_file
+    )
+    st.info(f"Large file ({total_rows} automations): showing aggregated views computed in chunks. Filters are not available.")
+
+    st.markdown("### 📊 Summary by Business Unit")
+    st.dataframe(bu_summary)
+
+    st.markdown("### 🚦 Business Unit Overuse Risk")
+    st.bar_chart(bu_summary.set_index('BusinessUnitName')['EstimatedAnnualRuns'])
+
+    st.markdown(f"### 📊 Automation Age Distribution ({age_counts.sum()} total automations)")
+    st.bar_chart(age_counts)
+
+    st.markdown("### 📊 Suggested Action Breakdown")
+    st.bar_chart(action_counts[action_counts > 0])
+
+    if top_errors is not None:
+        st.markdown(f"### 📈 Top {len(top_errors)} Error-Prone Automations")
+        st.dataframe(top_errors[['AutomationName', 'BusinessUnitName', 'SuggestedAction', 'LastRunTime', '30DayRunCount', 'ErrorRate']])
+
+elif uploaded_file:
+    df = annotate(uploaded_file.getvalue(), pd.Timestamp.now().floor('h'))
+    similar_groups = compute_similar_groups(tuple(sorted(df['AutomationName'].dropna().unique())))
 
     # Sidebar filters
     st.sidebar.header("🔍 Filters")
-    bu_filter = st.sidebar.multiselect("Filter by Business Unit", df['BusinessUnitName'].dropna().unique())
-    action_filter = st.sidebar.multiselect("Filter by Suggested Action", df['SuggestedAction'].dropna().unique())
+    bu_filter = st.sidebar.multiselect("Filter by Business Unit", df['BusinessUnitName'].cat.categories)
+    action_filter = st.sidebar.multiselect("Filter by Suggested Action", df['SuggestedAction'].dropna().unique().tolist())
     # Scheduled Frequency filter with 'Blank' support
-    df['ScheduleGroupFilter'] = df['ScheduleGroup'].fillna('Blank')
-    schedule_options = df['ScheduleGroupFilter'].unique()
+    schedule_options = df['ScheduleGroupFilter'].cat.categories
 
     scheduled_filter = st.sidebar.multiselect(
         "Filter by Scheduled Frequency (first part only)",
@@ -91,37 +381,41 @@ if uploaded_file:
 
     # 📊 Summary by Business Unit
     st.markdown("### 📊 Summary by Business Unit")
-    bu_summary = df.groupby('BusinessUnitName').agg(
+    # Hash-group on the category codes and only sort the per-BU result
+    bu_summary = df.groupby('BusinessUnitName', observed=True, sort=False).agg(
         TotalAutomations=('AutomationName', 'count'),
         ActiveAutomations=('IsActive', 'sum'),
         AvgSuccessRate=('SuccessRate', 'mean'),
         TotalRuns=('30DayRunCount', 'sum'),
         EstimatedAnnualRuns=('AnnualizedRunCount', 'sum')
-    ).reset_index()
+    ).sort_index().reset_index()
     st.dataframe(bu_summary)
 
     st.markdown("### 🚦 Business Unit Overuse Risk")
     st.bar_chart(bu_summary.set_index('BusinessUnitName')['EstimatedAnnualRuns'])
 
     # 📊 Automation Age Distribution
-    age_counts = df['AutomationAgeGroup'].value_counts().sort_index()
+    age_counts = df['AutomationAgeGroup'].value_counts(sort=False)
     st.markdown(f"### 📊 Automation Age Distribution ({age_counts.sum()} total automations)")
     st.bar_chart(age_counts)
 
     # 📊 Efficiency Score Distribution
+    # Expanders still execute their body, so the expensive matplotlib charts are drawn only when toggled on
     st.markdown("### 📊 Efficiency Score Distribution")
-    fig_eff, ax_eff = plt.subplots()
-    sns.histplot(df['EfficiencyScore'].dropna(), bins=20, kde=True, ax=ax_eff)
-    ax_eff.set_title("Automation Efficiency Score Distribution")
-    st.pyplot(fig_eff)
+    if st.toggle("Show efficiency chart", key="show_efficiency_chart"):
+        fig_eff, ax_eff = plt.subplots()
+        sns.histplot(df['EfficiencyScore'].dropna(), bins=20, kde=True, ax=ax_eff)
+        ax_eff.set_title("Automation Efficiency Score Distribution")
+        st.pyplot(fig_eff)
 
     # ⏱ High Frequency Automations
-    hourly = df[df['ScheduledFrequency'].str.contains("every hour", case=False, na=False)]
+    hourly = df[df['IsHourly']]
     st.markdown(f"### ⏱ High Frequency Automations ({len(hourly)})")
     st.dataframe(hourly[['AutomationName', 'BusinessUnitName', 'ScheduledFrequency', 'LastRunTime']])
 
     # ⚠️ Clashing Automations
-    clashing = df[df.duplicated("RoundedRunTime", keep=False)].sort_values("RoundedRunTime")
+    clash_mask = df.groupby('RoundedRunTime', sort=False)['AutomationName'].transform('size') > 1
+    clashing = df[clash_mask].sort_values("RoundedRunTime")
     st.markdown(f"### ⚠️ Clashing Automations ({clashing['AutomationName'].nunique()} unique automations)")
     st.dataframe(clashing[['AutomationName', 'BusinessUnitName', 'LastRunTime', 'RoundedRunTime']])
 
@@ -131,22 +425,10 @@ if uploaded_file:
     st.dataframe(flagged[['AutomationName', 'BusinessUnitName', 'SuggestedAction', 'LastRunTime', '30DayRunCount', 'ErrorRate']])
 
     # 🧠 Suggested Merges
-    def string_similarity(a, b):
-        return SequenceMatcher(None, a, b).ratio()
-
-    similar_groups = []
-    seen = set()
-    names = df['AutomationName'].dropna().unique()
-    for name in names:
-        if name in seen:
-            continue
-        group = [other for other in names if string_similarity(name, other) >= 0.85 and other != name]
-        if group:
-            group_set = set([name] + group)
-            if not group_set.issubset(seen):
-                similar_groups.append(group_set)
-                seen.update(group_set)
-
+    # Groups come from the full upload; only show the members that survive the filters
+    filtered_names = set(df['AutomationName'].dropna())
+    similar_groups = [group & filtered_names for group in similar_groups]
+    similar_groups = [group for group in similar_groups if len(group) > 1]
     st.markdown(f"### 🧠 Suggested Merges – Similar Automation Groups ({len(similar_groups)})")
     for idx, group in enumerate(similar_groups[:10], 1):
         st.markdown(f"**Group {idx}:** {', '.join(sorted(group))}")
@@ -162,14 +444,15 @@ if uploaded_file:
     # 📊 Suggested Action Breakdown
     st.markdown("### 📊 Suggested Action Breakdown")
     action_counts = df['SuggestedAction'].value_counts()
-    fig2, ax2 = plt.subplots()
-    ax2.pie(action_counts, labels=action_counts.index, autopct='%1.1f%%', startangle=90)
-    ax2.axis('equal')
-    st.pyplot(fig2)
+    action_counts = action_counts[action_counts > 0]
+    if not action_counts.empty:
+        fig2, ax2 = plt.subplots()
+        ax2.pie(action_counts, labels=action_counts.index, autopct='%1.1f%%', startangle=90)
+        ax2.axis('equal')
+        st.pyplot(fig2)
 
     # ⏰ Rush Hour Detection
     st.markdown("### ⏰ Rush Hour Detection")
-    df['HourOfDay'] = df['LastRunTime'].dt.hour
     rush_hour = df['HourOfDay'].value_counts().sort_index()
     st.bar_chart(rush_hour)
 
@@ -181,24 +464,29 @@ if uploaded_file:
 
     # 📈 Execution Timeline Chart
     st.markdown("### 📈 Execution Timeline Chart")
-    timeline_df = df[['AutomationName', 'BusinessUnitName', 'LastRunTime']].dropna()
-    fig_timeline, ax_timeline = plt.subplots(figsize=(10, 6))
-    sns.scatterplot(data=timeline_df, x='LastRunTime', y='AutomationName', hue='BusinessUnitName', s=60, ax=ax_timeline)
-    ax_timeline.set_title("Automation Execution Timeline")
-    ax_timeline.set_xlabel("Last Run Time")
-    ax_timeline.set_ylabel("Automation Name")
-    st.pyplot(fig_timeline)
+    if st.toggle("Show timeline chart", key="show_timeline_chart"):
+        timeline_df = df[['AutomationName', 'BusinessUnitName', 'LastRunTime']].dropna()
+        if len(timeline_df) > TIMELINE_MAX_POINTS:
+            timeline_df = timeline_df.sample(TIMELINE_MAX_POINTS, random_state=0)
+            st.caption(f"Showing a random sample of {TIMELINE_MAX_POINTS} automations.")
+        timeline_df = timeline_df.assign(BusinessUnitName=timeline_df['BusinessUnitName'].cat.remove_unused_categories())
+        fig_timeline, ax_timeline = plt.subplots(figsize=(10, 6))
+        sns.scatterplot(data=timeline_df, x='LastRunTime', y='AutomationName', hue='BusinessUnitName', s=60, ax=ax_timeline)
+        ax_timeline.set_title("Automation Execution Timeline")
+        ax_timeline.set_xlabel("Last Run Time")
+        ax_timeline.set_ylabel("Automation Name")
+        st.pyplot(fig_timeline)
 
     # 📥 Export Excel
     st.markdown("### 📤 Download Full Annotated Data")
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Full Data')
-        hourly.to_excel(writer, index=False, sheet_name='High Frequency')
-        flagged.to_excel(writer, index=False, sheet_name='Flagged')
-        clashing.to_excel(writer, index=False, sheet_name='Clashing')
-
-    st.download_button("📥 Download Excel Report", data=output.getvalue(), file_name="automation_analysis.xlsx")
+    if st.button("Prepare download"):
+        # Internal helper columns stay out of the user-facing exports
+        export_df, hourly, flagged, clashing = (
+            frame.drop(columns=INTERNAL_COLUMNS) for frame in (df, hourly, flagged, clashing)
+        )
+        excel_bytes = build_excel(export_df, hourly, flagged, clashing)
+        st.download_button("📥 Download Excel Report", data=excel_bytes, file_name="automation_analysis.xlsx")
+        st.download_button("📥 Download Full Data (Parquet)", data=build_parquet(export_df), file_name="automation_analysis.parquet")
 
 else:
     st.info("📎 Upload your CSV file to begin analysis.")